@@ -1,22 +1,13 @@
 ﻿import socket
 import os
-import socket
 import json
-import os
-import cv2
-import numpy as np
-import time
-import signal
-import sys
-import queue
-import multiprocessing as mp
-import re 
-import json
-import ollama
+import threading
+from llama_cpp import Llama, LlamaGrammar
 
 # Configuration
 SOCKET_PATH = "/tmp/digitaleye_brain.sock"
-MODEL_NAME = "gemma3:1b"
+MODEL_PATH = "../model/llm/gemma3-1b-q4_k_m.gguf"
+CLIENT_IDLE_TIMEOUT = 30  # Seconds a connection may sit idle before its thread gives it up
 
 SYSTEM_PROMPT = (
             "You are the brain of a wearable device. The user has spoken a command. You should analyze the intent of the users command and map it as defined below."            
@@ -38,43 +29,98 @@ SYSTEM_PROMPT = (
             "Example JSON: { \"intent\": \"IDENTIFY\", \"payload\": \"Read this sign\" }"
 )
 
+# Everything up to the user's text is identical on every request, so its KV cache is
+# evaluated once at startup and reused (llama.cpp only evaluates the differing suffix).
+PROMPT_PREFIX = f"<start_of_turn>user\n{SYSTEM_PROMPT}\n\nParse this:"
+
+# Output can only be {"intent": <one of the valid intents>, "payload": "..."}; decoding
+# ends at the closing brace, so no stop strings are needed.
+JSON_GRAMMAR = r'''
+root   ::= "{" ws "\"intent\"" ws ":" ws intent ws "," ws "\"payload\"" ws ":" ws string ws "}"
+intent ::= "\"IDENTIFY\"" | "\"SYSTEM\"" | "\"OVERRIDE\"" | "\"ERROR\""
+string ::= "\"" ( [^"\\\n] | "\\" ["\\/bfnrt] )* "\""
+ws     ::= " "?
+'''
+
+llm = None
+json_grammar = None
+# Connections are served on their own threads, but the llama.cpp context is not thread-safe
+llm_lock = threading.Lock()
+
+def load_model():
+    global llm, json_grammar
+    # No draft model: llama-cpp-python forces logits_all=True when one is set, and with
+    # Gemma 3's ~262k vocabulary that full logit row per token costs more than drafting
+    # saves on ~20-token answers.
+    llm = Llama(
+        model_path=MODEL_PATH,
+        n_ctx=1024,
+        n_threads=os.cpu_count(),
+        logits_all=False,
+        verbose=False
+    )
+    json_grammar = LlamaGrammar.from_string(JSON_GRAMMAR, verbose=False)
+    # Pre-warm: pin the static prompt prefix in the KV cache
+    llm.eval(llm.tokenize(PROMPT_PREFIX.encode('utf-8'), special=True))
+
 def handle_intent(text):
     try:
-        response = ollama.generate(
-            model=MODEL_NAME,
-            system=SYSTEM_PROMPT,
-            prompt=f"Parse this: {text}",
-            stream=False,
-            options={"temperature": 0}, # Keep it deterministic
-            format="json"
-        )
-        return response['response'].strip()
+        with llm_lock:
+            response = llm.create_completion(
+                prompt=f"{PROMPT_PREFIX} {text}<end_of_turn>\n<start_of_turn>model\n",
+                temperature=0, # Keep it deterministic
+                top_k=1,
+                max_tokens=48,
+                grammar=json_grammar
+            )
+        choice = response['choices'][0]
+        if choice['finish_reason'] == 'length':
+            # Cut off by max_tokens (e.g. a long IDENTIFY echo), so the JSON is incomplete
+            return json.dumps({"intent": "ERROR", "payload": "Command too long"})
+        return choice['text'].strip()
     except Exception as e:
         return json.dumps({"error": str(e)})
 
+def handle_client(conn):
+    # The connection stays open across commands; the client closing it, or leaving it idle
+    # (RouterService opens one per command and never closes it), ends the loop.
+    recv_buf = bytearray(1024)
+    recv_view = memoryview(recv_buf)
+    conn.settimeout(CLIENT_IDLE_TIMEOUT)
+    with conn:
+        while True:
+            try:
+                n = conn.recv_into(recv_view)
+                if not n: break
+                user_text = str(recv_view[:n], 'utf-8')
+                print(f"Received command: {user_text}")
+                result = handle_intent(user_text)
+                conn.sendall(result.encode('utf-8'))
+            except socket.timeout:
+                break
+            except Exception as e:
+                print(f"Error handling command: {e}")
+                break
+
 def start_server():
     print("Starting LLM Interface...")
+    load_model()
+    print(f"Loaded {MODEL_PATH}")
     # Clean up the socket if it already exists
     if os.path.exists(SOCKET_PATH):
         os.remove(SOCKET_PATH)
 
     server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
     server.bind(SOCKET_PATH)
-    server.listen(1)
+    server.listen(128)
     print(f"Brain Engine listening on {SOCKET_PATH}...")
-    conn, _ = server.accept()
     while True:
         conn, _ = server.accept()
         print("Client connected to Brain Engine")
-        try:
-            data = conn.recv(1024)
-            if not data: continue  
-            print(f"Received command: {data.decode('utf-8')}")
-            user_text = data.decode('utf-8')
-            result = handle_intent(user_text)
-            conn.sendall(result.encode('utf-8'))
-        except Exception as e:
-            print(f"Error handling command: {e}")
+        # One thread per connection: the host keeps an idle connection open for the
+        # lifetime of the service, which must not block per-command clients.
+        threading.Thread(target=handle_client, args=(conn,), daemon=True).start()
     print("Shutting down Brain Engine...")
 if __name__ == "__main__":
     start_server()
\ No newline at end of file
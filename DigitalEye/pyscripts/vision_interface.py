@@ -1,30 +1,53 @@
 import socket
 import json
+import orjson
 import os
 import cv2
 import numpy as np
 import time
 import signal
 import sys
-import queue
 import multiprocessing as mp
-import re 
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+import threading
+import concurrent.futures
+import logging
 from hailo_platform import VDevice
 from hailo_platform.genai import VLM
-from picamera2 import Picamera2
+from picamera2 import Picamera2, MappedArray
+from hailo_logger import get_logger, init_logging
+
+logger = get_logger(__name__)
 
 # Configuration
 SOCKET_PATH = "/tmp/digitaleye_vision.sock"
-HEF_PATH = "../model/vlm/Qwen2-VL-2B-Instruct.hef"
+# Override to point at a re-quantized build (e.g. a W8A8 recompile) without touching code
+HEF_PATH = os.getenv("DIGITALEYE_HEF_PATH", "../model/vlm/Qwen2-VL-2B-Instruct.hef")
+CAPTURE_INTERVAL = 0.1  # Background capture rate (~10 fps)
+FRAME_SLOTS = 3  # Shared-memory frame ring: latest, pinned by a request, being written
+FRAME_MAX_AGE = 1.0  # Seconds before the latest frame is too old to describe
+SAVE_QUEUE_DEPTH = 4  # Pending picture saves; each holds a full-res frame (~4 MB)
 
 # The system prompt should tell it to be concise.
 SYSTEM_PROMPT = "You are a visual guide for a blind user. You are being shown an image taken from a chest-mounted camera worn by the user. Help the user understand the environment they are in."
 USER_PROMPT = "Describe the scene in front of me."
 
+# Sentence boundary: one of these followed by whitespace, punctuation stays with the sentence
+_SENT_TERMINATORS = '.!?'
+
+# Streamed sentence message; only the answer needs JSON escaping, the rest is fixed.
+# "time" is milliseconds since the command arrived, quoted because the client reads it as a string.
+_TEXT_TEMPLATE = b'{"type":"text","text":{"answer":%s,"time":"%d"}}\n'
+
 class DigitalEyeBridge:
     def __init__(self):
         print(f"[INTERFACE] DigitalEye Brain: Initializing 10H Hardware...")
         self.running = True
+        # JPEG encode + SD card write for saved pictures, kept off the socket loop.
+        # The executor's own queue is unbounded, so the semaphore caps pending saves.
+        self._save_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._save_slots = threading.BoundedSemaphore(SAVE_QUEUE_DEPTH)
         try:
             # Initialize Backend (Background Worker)
             self.vision_engine = Backend(
@@ -32,7 +55,8 @@ class DigitalEyeBridge:
                 max_tokens=150,
                 temperature=0.1,
                 seed=42,
-                system_prompt=SYSTEM_PROMPT
+                system_prompt=SYSTEM_PROMPT,
+                src_is_bgr=False  # lores is configured below to deliver R,G,B
             )
         except Exception as e:
             print(f"[INTERFACE] Failed to initialize backend: {e}")
@@ -41,30 +65,90 @@ class DigitalEyeBridge:
 
         try:
             # Setup Camera 3 Wide
+            # main is the full-res stream for saved pictures; lores is scaled by the ISP so its
+            # height already matches the VLM input, leaving only a centre crop on the CPU.
+            # The crop is not done at the sensor (ScalerCrop) as it would also crop main.
+            # Picamera2 names formats by libcamera's convention: "RGB888" arrays are B,G,R
+            # (what cv2.imwrite wants), "BGR888" arrays are R,G,B (what the VLM wants),
+            # so neither path needs a cvtColor.
             self.picam2 = Picamera2()
             config = self.picam2.create_preview_configuration(
                 sensor={"output_size": (2304, 1296)},
-                main={"size": (1536, 864), "format": "RGB888"}
+                main={"size": (1536, 864), "format": "RGB888"},
+                lores={"size": (598, 336), "format": "BGR888"}
             )
             self.picam2.configure(config)
+            # The lores shape never changes once configured, so its crop plan is fixed up front
+            self.vision_engine.plan_fast_resize(*self.picam2.camera_configuration()["lores"]["size"])
             self.picam2.start()
             print(f"[INTERFACE] Camera Initialized.")
 
+            # Background capture keeps the latest preprocessed frame ready in the engine's
+            # shared-memory ring. It only ever writes a slot that is neither the latest frame
+            # nor pinned by an in-flight request, so no reader (or the VLM worker) sees a
+            # half-written frame.
+            self._latest = -1
+            self._latest_time = 0.0  # time.monotonic() of the latest frame
+            self._pinned = -1
+            self._frame_lock = threading.Lock()
+            self._frame_ready = threading.Event()
+            self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self._capture_thread.start()
+
         except Exception as e:
             print(f"[INTERFACE] Failed to initialize camera: {e}")
             self.running = False
             if hasattr(self, 'vision_engine'):
                 self.vision_engine.close()
 
-    def capture_and_preprocess(self):
-        img = self.picam2.capture_array()
-        frame = Backend.convert_resize_image(img)
-        # Convert RGB to BGR for OpenCV/Storage if needed, but Engine handles RGB.
-        # Let's keep it raw for the engine which does its own conversion.
-        return frame
+    def _capture_loop(self):
+        slots = self.vision_engine.frame_slots
+        while self.running:
+            start = time.time()
+            with self._frame_lock:
+                write_idx = next(i for i in range(len(slots)) if i != self._latest and i != self._pinned)
+            try:
+                # Preprocess from the camera's buffer in place, then return it to the camera
+                request = self.picam2.capture_request()
+                try:
+                    with MappedArray(request, "lores") as m:
+                        self.vision_engine.convert_resize_image_fast(m.array, out=slots[write_idx])
+                finally:
+                    request.release()
+            except Exception as e:
+                print(f"[INTERFACE] Capture failed: {e}")
+                time.sleep(CAPTURE_INTERVAL)
+                continue
+            with self._frame_lock:
+                self._latest = write_idx
+                self._latest_time = time.monotonic()
+            self._frame_ready.set()
+            time.sleep(max(0.0, CAPTURE_INTERVAL - (time.time() - start)))
+
+    def save_picture(self, frame, filename):
+        # Returns immediately; the encode and write happen on the save pool.
+        # False when SAVE_QUEUE_DEPTH saves are already pending and the frame was dropped.
+        if not self._save_slots.acquire(blocking=False):
+            return False
+        future = self._save_pool.submit(self._write_picture, frame, filename)
+        future.add_done_callback(lambda _: self._save_slots.release())
+        return True
+
+    @staticmethod
+    def _write_picture(frame, filename):
+        # Nobody waits on the future, so failures have to be reported here
+        try:
+            if not cv2.imwrite(filename, frame, [cv2.IMWRITE_JPEG_QUALITY, 85]):
+                print(f"[INTERFACE] Failed to save captured image to {filename}")
+        except Exception as e:
+            print(f"[INTERFACE] Failed to save captured image to {filename}: {e}")
 
     def close(self):
         self.running = False
+        if hasattr(self, '_capture_thread'):
+            self._capture_thread.join(timeout=1)
+        # Let pending picture saves finish
+        self._save_pool.shutdown(wait=True)
         if hasattr(self, 'picam2'):
             self.picam2.stop()
         if hasattr(self, 'vision_engine'):
@@ -76,95 +160,144 @@ class DigitalEyeBridge:
             yield "Vision engine not initialized"
             return
             
-        frame = self.capture_and_preprocess()
-        # vlm_inference is a generator, so we yield directly from it
-        for result_sentence in self.vision_engine.vlm_inference(frame, SYSTEM_PROMPT, prompt):
-            yield result_sentence
+        # Pin the latest frame; the worker reads it in place, no copy
+        if not self._frame_ready.wait(timeout=FRAME_MAX_AGE):
+            yield "Error: No camera frame available"
+            return
+        with self._frame_lock:
+            # Captures may have started failing since; never describe an old scene as current
+            if time.monotonic() - self._latest_time > FRAME_MAX_AGE:
+                yield "Error: Camera frame is out of date"
+                return
+            slot = self._pinned = self._latest
+        try:
+            # vlm_inference is a generator, so we yield directly from it. If we are closed
+            # early, yield from closes it too, which waits for the worker to release the slot.
+            yield from self.vision_engine.vlm_inference(slot, prompt)
+        finally:
+            with self._frame_lock:
+                self._pinned = -1
+
+def resize_crop_roi(src_h: int, src_w: int, out_h: int, out_w: int) -> tuple[slice, slice]:
+    # Source region that a cover-resize + center crop keeps. Resizing just this region
+    # gives the same output with no oversized intermediate. Depends only on the shapes.
+    scale = max(out_w / src_w, out_h / src_h)
+    roi_w, roi_h = min(round(out_w / scale), src_w), min(round(out_h / scale), src_h)
+    x_start, y_start = (src_w - roi_w) // 2, (src_h - roi_h) // 2
+    return slice(y_start, y_start + roi_h), slice(x_start, x_start + roi_w)
+
 class Backend:
     def __init__(self, hef_path: str, max_tokens: int = 200, temperature: float = 0.1,
-                 seed: int = 42, system_prompt: str = 'You are a helpful assistant.') -> None:
+                 seed: int = 42, system_prompt: str = 'You are a helpful assistant.',
+                 target_size: tuple[int, int] = (336, 336), src_is_bgr: bool = True) -> None:
         self.hef_path = hef_path
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.seed = seed
         self.system_prompt = system_prompt
+        self.target_size = target_size
+        # True when input frames arrive B,G,R and must be swapped to the model's R,G,B
+        self.expects_bgr_input = src_is_bgr
+        # Crop plan for camera frames, set by plan_fast_resize()
+        self._fast_roi = None
+
+        # Preprocessed frames are written into these slots. They live in shared memory so
+        # the worker reads the pixels in place; a request only names the slot to use.
+        target_w, target_h = target_size
+        frame_shape = (FRAME_SLOTS, target_h, target_w, 3)
+        self._shm = shared_memory.SharedMemory(create=True, size=FRAME_SLOTS * target_h * target_w * 3)
+        self.frame_slots = np.ndarray(frame_shape, dtype=np.uint8, buffer=self._shm.buf)
 
         self._request_queue = mp.Queue(maxsize=10)
-        self._response_queue = mp.Queue(maxsize=100)
+        # Responses go over a one-way pipe: no feeder thread and no extra lock per chunk
+        self._resp_rx, self._resp_tx = mp.Pipe(duplex=False)
+        # Set by the worker once the VLM is loaded
+        self._ready_event = mp.Event()
         self._process = mp.Process(
             target=vlm_worker_process,
-            args=(self._request_queue, self._response_queue, self.hef_path, self.max_tokens, self.temperature, self.seed)
+            args=(self._request_queue, self._resp_tx, self.hef_path, self.max_tokens, self.temperature, self.seed,
+                  self.system_prompt, self._shm.name, frame_shape, self._ready_event)
         )
         self._process.start()
+        # Only the worker writes; with the parent's copy closed, a dead worker reads as EOF
+        self._resp_tx.close()
 
-    def vlm_inference(self, image: np.ndarray, system_prompt: str, user_prompt: str, timeout: int = 30):
+    def vlm_inference(self, slot: int, user_prompt: str, timeout: int = 30):
+        # The system prompt is fixed per Backend and held by the worker
         request_data = {
-            'numpy_image': self.convert_resize_image(image),
+            'slot': slot,
             'prompts': {
-                'system_prompt': system_prompt,
                 'user_prompt': user_prompt,
             }
         }
         self._request_queue.put(request_data)
 
-        while True:
-            try:
-                response = self._response_queue.get(timeout=timeout)                
-                if response.get('status') == 'streaming':
-                    yield response['chunk']
-                
-                elif response.get('status') == 'complete':
-                    break
-                
-                elif response.get('status') == 'error':
-                    yield f"Error: {response['error']}"
-                    break
+        finished = False
+        try:
+            while True:
+                try:
+                    if not self._resp_rx.poll(timeout):
+                        yield "Error: Timeout"
+                        break
+                    response = self._resp_rx.recv()
+                    if response.get('status') == 'streaming':
+                        yield response['chunk']
                     
-                elif response.get('init'):
-                    continue
+                    elif response.get('status') == 'complete':
+                        finished = True
+                        result = response.get('result') or {}
+                        logger.debug("VLM generation finished in %ss", result.get('time'))
+                        break
                     
-            except mp.TimeoutError:
-                yield "Error: Timeout"
-                break
-            except Exception as e:
-                yield f"Error: {str(e)}"
-                break
+                    elif response.get('status') == 'error':
+                        finished = True
+                        yield f"Error: {response['error']}"
+                        break
+                        
+                except EOFError:
+                    finished = True
+                    yield "Error: Vision worker exited"
+                    break
+                except Exception as e:
+                    yield f"Error: {str(e)}"
+                    break
+        finally:
+            # The worker reads the shared frame in place until it reports back. If the caller
+            # stopped early (e.g. the client disconnected mid-stream), wait for that here so the
+            # next request neither overwrites the frame mid-generation nor receives stale chunks.
+            if not finished:
+                self._wait_for_completion(timeout)
+
+    def _wait_for_completion(self, timeout: int) -> None:
+        while self._resp_rx.poll(timeout):
+            try:
+                response = self._resp_rx.recv()
+            except EOFError:
+                return
+            if response.get('status') in ('complete', 'error'):
+                return
 
     def _cleanup_queues(self) -> None:
         while not self._request_queue.empty():
             try: self._request_queue.get_nowait()
             except: break
-        while not self._response_queue.empty():
-            try: self._response_queue.get_nowait()
+        while self._resp_rx.poll():
+            try: self._resp_rx.recv()
             except: break
 
-    def _isReady(self) -> bool:
-        if getattr(self, "_ready", False):
-            return self._process.is_alive()
-        if not self._process.is_alive():
-            return False
-        try:
-            msg = self._response_queue.get(timeout=0.01)
-            if isinstance(msg, dict) and msg.get('init') == 'VLM initialized':
-                self._ready = True
-                return True
-            self._response_queue.put(msg)
-        except queue.Empty:
-            pass
-        return False
+    def plan_fast_resize(self, src_w: int, src_h: int) -> None:
+        target_w, target_h = self.target_size
+        self._fast_roi = resize_crop_roi(src_h, src_w, target_h, target_w)
 
-    @staticmethod
-    def convert_resize_image(image_array: np.ndarray, target_size: tuple[int, int] = (336, 336)) -> np.ndarray:
-        if len(image_array.shape) == 3 and image_array.shape[2] == 3:
-            image_array = cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB)
-        h, w = image_array.shape[:2]
-        target_w, target_h = target_size
-        scale = max(target_w / w, target_h / h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        resized = cv2.resize(image_array, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-        x_start, y_start = (new_w - target_w) // 2, (new_h - target_h) // 2
-        cropped = resized[y_start:y_start+target_h, x_start:x_start+target_w]
-        return cropped.astype(np.uint8)
+    def convert_resize_image_fast(self, image_array: np.ndarray, out: np.ndarray) -> np.ndarray:
+        # Camera frames only: the (src_h, src_w, 3) shape was fixed by plan_fast_resize()
+        # and `out` is a frame slot, so nothing is checked or looked up per frame.
+        rows, cols = self._fast_roi
+        cv2.resize(image_array[rows, cols], self.target_size, dst=out, interpolation=cv2.INTER_AREA)
+        if self.expects_bgr_input:
+            # Swap on the 336x336 output, not the full source frame
+            cv2.cvtColor(out, cv2.COLOR_BGR2RGB, dst=out)
+        return out
 
     def close(self) -> None:
         try:
@@ -174,12 +307,34 @@ class Backend:
                 self._process.terminate()
         except Exception:
             pass
+        self._resp_rx.close()
+        try:
+            # The ndarray view must be dropped before the mapping can be closed. close() can
+            # still raise BufferError if the capture thread outlived its join and holds a view,
+            # but the segment must be unlinked regardless or it leaks in /dev/shm.
+            self.frame_slots = None
+            self._shm.close()
+        except Exception:
+            pass
+        finally:
+            try:
+                self._shm.unlink()
+            except Exception:
+                pass
 
 def start_vision_engine():
+    # Quiet by default so the per-sentence/per-token debug logging costs nothing;
+    # HAILO_LOG_LEVEL=DEBUG turns it back on.
+    init_logging(level=None if os.getenv("HAILO_LOG_LEVEL") else "WARNING")
+    # Frame preprocessing runs in this process, so let OpenCV use every core and its NEON paths
+    cv2.setUseOptimized(True)
+    cv2.setNumThreads(os.cpu_count() or 4)
+
     if os.path.exists(SOCKET_PATH):
         os.remove(SOCKET_PATH)
 
     server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
     server.bind(SOCKET_PATH)
     server.listen(1)
     
@@ -203,45 +358,50 @@ def start_vision_engine():
         conn, _ = server.accept()
         
         # Wait for backend to be ready before acknowledging client
-        while not bridge.vision_engine._isReady():
-            time.sleep(1)
+        bridge.vision_engine._ready_event.wait()
             
-        ready_msg = json.dumps({'type': 'ready', 'text': {"answer": "Ready", "time": "0"}}) + "\n"
+        ready_msg = orjson.dumps({'type': 'ready', 'text': {"answer": "Ready", "time": "0"}},
+                                 option=orjson.OPT_APPEND_NEWLINE)
         print("[INTERFACE] Sending READY signal to client.")
-        conn.sendall(ready_msg.encode('utf-8'))
+        conn.sendall(ready_msg)
         
+        # Reused by every recv on this connection
+        recv_buf = bytearray(1024)
+        recv_view = memoryview(recv_buf)
         try:
             while True:
-                data = conn.recv(1024)
-                if not data: break                
+                n = conn.recv_into(recv_view)
+                if not n: break                
                 try:
-                    command = data.decode('utf-8')
-                    print(f"[INTERFACE] Received command: {command}")
+                    command = str(recv_view[:n], 'utf-8')
+                    logger.debug("Received command: %s", command)
 
                     if command == "take a picture":
-                        frame = bridge.capture_and_preprocess()
-                        # OpenCV expects BGR
-                        frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                        frame_resized = bridge.picam2.capture_array()
+                        # RGB888 from Picamera2 is already BGR byte order, which is what OpenCV writes.
+                        frame_full = bridge.picam2.capture_array()
                         timestamp = int(time.time())
                         
                         # Ensure directory exists
                         os.makedirs("./captures", exist_ok=True)
                         filename = f"./captures/captured_{timestamp}.jpg"
-                        cv2.imwrite(filename, frame_resized)
-                        
-                        response_text = json.dumps({"type": "text", "text": {"answer": "Image saved", "time": "0"}})
-                        print(f"[INTERFACE] Captured image saved to {filename}")
-                        conn.sendall(response_text.encode('utf-8') + b"\n")
+                        # capture_array() returns a fresh array, safe to hand to the writer thread
+                        if bridge.save_picture(frame_full, filename):
+                            answer = "Image saved"
+                            print(f"[INTERFACE] Saving captured image to {filename}")
+                        else:
+                            answer = "Error: Still saving previous pictures"
+                            print(f"[INTERFACE] Save queue full, dropped {filename}")
+
+                        response_text = orjson.dumps({"type": "text", "text": {"answer": answer, "time": "0"}},
+                                                     option=orjson.OPT_APPEND_NEWLINE)
+                        conn.sendall(response_text)
 
                     else:
+                        t0 = time.monotonic_ns()
                         for sentence in bridge.get_image_description(command):
-                            response_text = json.dumps({
-                                "type": "text", 
-                                "text": {"answer": sentence, "time": str(time.time())}
-                            })
-                            print(f"[INTERFACE] Sending sentence: {sentence}")
-                            conn.sendall(response_text.encode('utf-8') + b"\n")
+                            payload = _TEXT_TEMPLATE % (orjson.dumps(sentence), (time.monotonic_ns() - t0) // 1_000_000)
+                            logger.debug("Sending sentence: %s", sentence)
+                            conn.sendall(payload)
                 except json.JSONDecodeError:
                     print("[INTERFACE] JSON Decode Error")
                 except Exception as e:
@@ -252,15 +412,25 @@ def start_vision_engine():
         finally:
             conn.close()
 
-def vlm_worker_process(request_queue: mp.Queue, response_queue: mp.Queue, hef_path: str,
-                      max_tokens: int, temperature: float, seed: int) -> None:
+def vlm_worker_process(request_queue: mp.Queue, response_conn: Connection, hef_path: str,
+                      max_tokens: int, temperature: float, seed: int, system_prompt: str, shm_name: str,
+                      frame_shape: tuple, ready_event: mp.Event) -> None:
+    frames = None
     try:
+        # Attach once; every request's frame is read in place from this same view
+        shm = shared_memory.SharedMemory(name=shm_name)
+        frames = np.ndarray(frame_shape, dtype=np.uint8, buffer=shm.buf)
         params = VDevice.create_params()
         params.group_id = "SHARED"
         vdevice = VDevice(params)
         vlm = VLM(vdevice, hef_path)
+        # Same on every request, so built once
+        system_message = {
+            "role": "system",
+            "content": [{"type": "text", "text": system_prompt}]
+        }
         print("[ENGINE] VLM initialized.")
-        response_queue.put({'init': 'VLM initialized', 'error': None})
+        ready_event.set()
         while True:
             item = request_queue.get()
             if item is None:
@@ -268,36 +438,47 @@ def vlm_worker_process(request_queue: mp.Queue, response_queue: mp.Queue, hef_pa
 
             try:
                 result = _hailo_inference_inner(
-                    item['numpy_image'],
+                    frames[item['slot']],
+                    system_message,
                     item['prompts'],
                     vlm,
                     max_tokens,
                     temperature,
                     seed, 
-                    response_queue
+                    response_conn
                 )
-                response_queue.put({'status': 'complete', 'error': None})
-                response_queue.put({'result': result, 'error': None})
+                response_conn.send({'status': 'complete', 'result': result, 'error': None})
             except Exception as e:
-                response_queue.put({'status': 'error', 'error': str(e)})
+                response_conn.send({'status': 'error', 'error': str(e)})
     except Exception as e:
-            response_queue.put({'status': 'error', 'error': str(e)})
+            response_conn.send({'status': 'error', 'error': str(e)})
     finally:
         try:
             vlm.release()
             vdevice.release()
         except Exception as e:
             print(f"Error during cleanup in worker: {e}")
-
-def _hailo_inference_inner(image: np.ndarray, prompts: dict, vlm: VLM,
-                          max_tokens: int, temperature: float, seed: int, response_queue: mp.Queue) -> dict:
+        if frames is not None:
+            frames = None
+            shm.close()
+
+def _sentence_end(text: str) -> int:
+    # Index just past the earliest terminator that is followed by whitespace, or -1
+    end = -1
+    for term in _SENT_TERMINATORS:
+        pos = text.find(term)
+        while pos != -1 and (pos + 1 == len(text) or not text[pos + 1].isspace()):
+            pos = text.find(term, pos + 1)
+        if pos != -1 and (end == -1 or pos < end):
+            end = pos + 1
+    return end
+
+def _hailo_inference_inner(image: np.ndarray, system_message: dict, prompts: dict, vlm: VLM,
+                          max_tokens: int, temperature: float, seed: int, response_conn: Connection) -> dict:
     try:
         start_time = time.time()
         prompt = [
-            {
-                "role": "system",
-                "content": [{"type": "text", "text": prompts["system_prompt"]}]
-            },
+            system_message,
             {
                 "role": "user",
                 "content": [
@@ -307,34 +488,43 @@ def _hailo_inference_inner(image: np.ndarray, prompts: dict, vlm: VLM,
             }
         ]     
 
-        # Buffer now holds raw text, not a list of tokens
-        text_buffer = ""
-        print(prompts)
-        print(prompt)
+        # Tokens since the last emitted sentence; only joined when a boundary may have completed
+        parts = []
+        # True while the pending text holds a terminator that is still waiting for its whitespace
+        held = False
+        # Checked once, not per token
+        debug_tokens = logger.isEnabledFor(logging.DEBUG)
+        logger.debug("prompts %s", prompts)
+        logger.debug("prompt %s", prompt)
         with vlm.generate(prompt=prompt, frames=[image], temperature=temperature, seed=seed, max_generated_tokens=max_tokens) as generation:
             for chunk in generation:
                 if chunk == '<|im_end|>':
                     continue
-                print(chunk)  # For debugging
-                text_buffer += chunk
-                
-                # Split using lookbehind to keep the punctuation attached to the sentence
-                # Matches: (. or ? or !) followed by whitespace
-                sentences = re.split(r'(?<=[.!?])\s+', text_buffer)
-
-                if len(sentences) > 1:
-                    # We have at least one complete sentence.
-                    # The last item in the list is the "remainder" (incomplete sentence).
-                    complete_sentences = sentences[:-1]
-                    text_buffer = sentences[-1]
-
-                    for sent in complete_sentences:
-                        if sent.strip():
-                             response_queue.put({'status': 'streaming', 'chunk': sent.strip()})
+                if debug_tokens:
+                    logger.debug("tok %s", chunk)
+                parts.append(chunk)
+                if not held:
+                    held = any(c in chunk for c in _SENT_TERMINATORS)
+                # A sentence ends at a terminator followed by whitespace, so nothing can
+                # complete until a terminator is held and whitespace arrives after it.
+                if not held or not any(map(str.isspace, chunk)):
+                    continue
+
+                text_buffer = "".join(parts)
+                end = _sentence_end(text_buffer)
+                while end != -1:
+                    sent = text_buffer[:end].strip()
+                    if sent:
+                        response_conn.send({'status': 'streaming', 'chunk': sent})
+                    text_buffer = text_buffer[end:].lstrip()
+                    end = _sentence_end(text_buffer)
+                parts = [text_buffer] if text_buffer else []
+                held = any(c in text_buffer for c in _SENT_TERMINATORS)
 
             # Flush any remaining text in the buffer when generation ends
-            if text_buffer.strip():
-                response_queue.put({'status': 'streaming', 'chunk': text_buffer.strip()})
+            text_buffer = "".join(parts).strip()
+            if text_buffer:
+                response_conn.send({'status': 'streaming', 'chunk': text_buffer})
 
         vlm.clear_context()
         return {'answer': 'Generation Complete', 'time': f"{time.time() - start_time:.2f}"}
@@ -48,7 +48,7 @@ echo Copying installer scripts and configs...
 copy "deploy\*.sh" "%USB_PATH%\" /Y
 copy "deploy\requirements.txt" "%USB_PATH%\configs\" /Y
 copy "deploy\digitaleye.service" "%USB_PATH%\configs\systemd\" /Y
-copy "model_assets\ollama-linux-arm64.tar.zst" "%USB_PATH%\" /Y
+if exist "model_assets\gemma3-1b-q4_k_m.gguf" copy "model_assets\gemma3-1b-q4_k_m.gguf" "%USB_PATH%\" /Y
 
 :: --- 5. Finalize ---
 :: Windows handles 'sync' automatically on copy completion, 
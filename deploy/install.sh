@@ -24,16 +24,27 @@ if ! grep -q "dtparam=pciex1_gen=3" /boot/firmware/config.txt; then
     echo "dtparam=pciex1_gen=3" | sudo tee -a /boot/firmware/config.txt
 fi
 
-#4. Install ollama
-sudo tar --use-compress-program=unzstd -xvf $SCRIPT_DIR/ollama-linux-amd64.tar.zst -C /usr
-
-# 5. Setup digitaleye Directory Structure
+# 4. Setup digitaleye Directory Structure
 sudo mkdir -p /opt/digitaleye
 sudo chown $USER:$USER /opt/digitaleye
 sudo rsync -avP -P $SCRIPT_DIR/apps/ /opt/digitaleye/
 sudo cp $SCRIPT_DIR/configs/requirements.txt /opt/digitaleye/
 sudo chmod +x /opt/digitaleye/DigitalEye
 
+# 5. Install the intent model for brain_engine.py (loaded in-process by llama.cpp)
+# Copied from the installer media if present, otherwise downloaded.
+LLM_MODEL=/opt/digitaleye/model/llm/gemma3-1b-q4_k_m.gguf
+sudo mkdir -p /opt/digitaleye/model/llm
+if [ -f "$SCRIPT_DIR/gemma3-1b-q4_k_m.gguf" ]; then
+    sudo cp $SCRIPT_DIR/gemma3-1b-q4_k_m.gguf $LLM_MODEL
+elif [ ! -f "$LLM_MODEL" ]; then
+    # Download beside the target and move it into place only once complete, so a failed
+    # download never leaves a partial model that later runs would skip over.
+    sudo rm -f $LLM_MODEL.part
+    sudo wget -O $LLM_MODEL.part https://huggingface.co/ggml-org/gemma-3-1b-it-GGUF/resolve/main/gemma-3-1b-it-Q4_K_M.gguf
+    sudo mv $LLM_MODEL.part $LLM_MODEL
+fi
+
 # 6. Python Environment & Hailo Pip Installs
 echo "cd "
 cd /opt/digitaleye